@@ -0,0 +1,195 @@
+import argparse
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from compactstats import STATS_FULL, STATS_MODES, STATS_SUMMARY, to_json
+from customrng import RNG_BACKENDS, benchmark_rng
+from runner import DEFAULT_REPLICATIONS, DEFAULT_SEED, chunk_seed, config_from_params, iter_simulation, summarize_stats
+
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    tomllib = None
+
+# ============================ #
+#   ЗАПУСК БЕЗ НОУТБУКА (CLI)  #
+# ============================ #
+# python -m cathousecli run   --config factory.toml [--rng-config rng.json] --replications 1000 --workers 8
+# python -m cathousecli sweep --config factory.toml --grid grid.toml --replications 99 --output results.jsonl
+# python -m cathousecli bench --config factory.toml --replications 20
+#
+# Результаты - по строке JSON на каждый прогон, пишутся по мере готовности.
+
+DEFAULT_CHUNK_SIZE = 10
+
+
+def load_file(path):
+    if path is None:
+        return dict()
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise SystemExit("TOML configs require python 3.11+")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_params(args):
+    params = load_file(args.config)
+    if args.rng_config is not None:
+        params["RNG_CONFIG"] = load_file(args.rng_config)
+    # проверяем конфиг до запуска воркеров
+    try:
+        config_from_params(params)
+    except (TypeError, ValueError) as error:
+        raise SystemExit(f"invalid config: {error}")
+    return params
+
+
+def make_tasks(params, seed, replications, chunk_size, rng_backend=None, extra=None):
+    # (params, seed, first_replication, replications, rng_backend, extra полей записи) на каждую пачку прогонов
+    extra = dict() if extra is None else extra
+    return [
+        (params, chunk_seed(seed, chunk_index), chunk_index * chunk_size, min(chunk_size, replications - start), rng_backend, extra)
+        for chunk_index, start in enumerate(range(0, replications, chunk_size))
+    ]
+
+
+def iter_task_records(params, seed, first_replication, replications, rng_backend, full_stats):
+    # full_stats - режим статистики (STATS_FULL/STATS_COMPACT/STATS_SUMMARY) или None, если нужны только итоги
+    stats_mode = STATS_SUMMARY if full_stats is None else full_stats
+    stats = iter_simulation(config_from_params(params), seed, replications, stats_mode, rng_backend)
+    for i, stat in enumerate(stats):
+        record = {"replication": first_replication + i, "seed": seed}
+        if full_stats is not None:
+            record.update(stat)
+        else:
+            record.update(summarize_stats([stat])[0])
+            record["execution_times_by_phase"] = stat["execution_times_by_phase"]
+        yield record
+
+
+def _run_task(params, seed, first_replication, replications, rng_backend, full_stats):
+    return list(iter_task_records(params, seed, first_replication, replications, rng_backend, full_stats))
+
+
+def iter_records(tasks, workers, full_stats):
+    if workers <= 1:
+        for params, seed, first_replication, replications, rng_backend, extra in tasks:
+            for record in iter_task_records(params, seed, first_replication, replications, rng_backend, full_stats):
+                yield {**extra, **record}
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_run_task, params, seed, first_replication, replications, rng_backend, full_stats): extra
+            for params, seed, first_replication, replications, rng_backend, extra in tasks
+        }
+        for future in as_completed(futures):
+            for record in future.result():
+                yield {**futures[future], **record}
+
+
+def write_records(records, output):
+    out = sys.stdout if output in (None, "-") else open(output, "w")
+    try:
+        for record in records:
+            out.write(json.dumps(record, default=to_json) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def grid_points(grid, one_at_a_time):
+    if one_at_a_time:
+        # как в lab3: варьируем по одному параметру, остальные по умолчанию
+        return [{name: value} for name, values in grid.items() for value in values]
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def cmd_run(args):
+    params = load_params(args)
+    tasks = make_tasks(params, args.seed, args.replications, args.chunk_size, args.rng_backend)
+    write_records(iter_records(tasks, args.workers, full_stats_mode(args)), args.output)
+
+
+def full_stats_mode(args):
+    return args.stats_mode if args.full_stats else None
+
+
+def cmd_sweep(args):
+    base_params = load_params(args)
+    points = grid_points(load_file(args.grid), args.one_at_a_time)
+    tasks = []
+    for point_index, point in enumerate(points):
+        params = {**base_params, **point}
+        config_from_params(params)
+        tasks.extend(make_tasks(params, args.seed, args.replications, args.chunk_size, args.rng_backend, {"point": point_index, "params": point}))
+    write_records(iter_records(tasks, args.workers, full_stats_mode(args)), args.output)
+
+
+def cmd_bench(args):
+    params = load_params(args)
+    tasks = make_tasks(params, args.seed, args.replications, args.chunk_size, args.rng_backend)
+    start = time.perf_counter()
+    completed = sum(1 for _ in iter_records(tasks, args.workers, None))
+    seconds = time.perf_counter() - start
+    records = [{
+        "replications": completed,
+        "workers": args.workers,
+        "rng_backend": args.rng_backend or config_from_params(params).RNG_BACKEND,
+        "seconds": seconds,
+        "replications_per_second": completed / seconds,
+    }]
+    if args.rng_draws:
+        # сравнение бэкендов генератора на скалярном uniform()
+        records += [
+            {"rng_backend": backend, "draws": args.rng_draws, "draws_per_second": benchmark_rng(backend, args.rng_draws, args.seed)}
+            for backend in RNG_BACKENDS
+        ]
+    write_records(records, args.output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cathousecli", description="Прогоны CatHouseFactory без ноутбука")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", help="параметры CatFactoryConfig (JSON/TOML)")
+    common.add_argument("--rng-config", help="RNG_CONFIG (JSON/TOML)")
+    common.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    common.add_argument("--replications", type=int, default=DEFAULT_REPLICATIONS)
+    common.add_argument("--workers", type=int, default=1)
+    common.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="прогонов на задачу воркера (у каждой пачки свой сид)")
+    common.add_argument("--rng-backend", choices=sorted(RNG_BACKENDS), default=None, help="бэкенд CustomRNG вместо RNG_BACKEND из конфига")
+    common.add_argument("--output", "-o", default=None, help="файл для JSONL, по умолчанию stdout")
+
+    run_parser = subparsers.add_parser("run", parents=[common], help="прогоны одного конфига")
+    run_parser.add_argument("--full-stats", action="store_true", help="писать house_testing_metas и прочую полную статистику")
+    run_parser.add_argument("--stats-mode", choices=STATS_MODES, default=STATS_FULL, help="представление house_testing_metas при --full-stats")
+    run_parser.set_defaults(handler=cmd_run)
+
+    sweep_parser = subparsers.add_parser("sweep", parents=[common], help="перебор параметров")
+    sweep_parser.add_argument("--grid", required=True, help="параметр -> список значений (JSON/TOML)")
+    sweep_parser.add_argument("--one-at-a-time", action="store_true", help="варьировать по одному параметру (как в lab3)")
+    sweep_parser.add_argument("--full-stats", action="store_true")
+    sweep_parser.add_argument("--stats-mode", choices=STATS_MODES, default=STATS_FULL)
+    sweep_parser.set_defaults(handler=cmd_sweep)
+
+    bench_parser = subparsers.add_parser("bench", parents=[common], help="замер скорости прогонов")
+    bench_parser.add_argument("--rng-draws", type=int, default=0, help="дополнительно замерить бэкенды генератора на N числах")
+    bench_parser.set_defaults(handler=cmd_bench)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
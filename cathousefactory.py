@@ -1,15 +1,18 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Mapping, Union
 import simpy
 import random
 import math
+from array import array
 from sortedcontainers import SortedList
 
 from models import CatHouse, CatHousePart, CatHouseSpec, CatHouseType, PremiumCatHouse, RawWoodPlank, RawFabricRoll, PaintBucket, StandardCatHouse
 from models import Color, WoodenHousePart, WoodenPartType, FabricHousePart, FabricPartType
 from models import StandardHouseSpec, PremiumHouseSpec
-from customrng import CustomRNG
+from customrng import CustomRNG, check_rng_backend
+from compactstats import STATS_FULL, make_house_testing_metas
+from samplers import RNGSamplers, compile_rng_config, freeze_rng_config, thaw_rng_config
 
 class CatFactoryConfig:
     PLANNED_HOUSES_NUM: float
@@ -37,6 +40,10 @@ class CatFactoryConfig:
     MAX_ENTRY_TIME: int
     MIN_TIME_INSIDE: int
     MAX_TEST_TIME: int
+
+    ANALYTIC_TESTING: bool
+
+    RNG_BACKEND: str
     
     DEFAULT_RNG_CONFIG = {
         "material_delivery_time": {
@@ -84,7 +91,10 @@ class CatFactoryConfig:
             "sigma": 5
         }
     }
-    RNG_CONFIG: Dict
+    # только для чтения (MappingProxyType), модель читает RNG_SAMPLERS
+    RNG_CONFIG: Mapping
+    # проверенный и скомпилированный RNG_CONFIG, им пользуется модель
+    RNG_SAMPLERS: RNGSamplers
 
     def __init__(
             self,
@@ -105,6 +115,8 @@ class CatFactoryConfig:
             MAX_TEST_TIME = 60,
             RNG_CONFIG = DEFAULT_RNG_CONFIG,
             DETAIL_PROCESSING_TIME_OVERRIDE = None, # костыль для удобства
+            ANALYTIC_TESTING = False,
+            RNG_BACKEND = "lcg", # см. customrng.RNG_BACKENDS
         ):
         self.PLANNED_HOUSES_NUM = PLANNED_HOUSES_NUM
         self.PLANNED_PREMIUM_RATIO = PLANNED_PREMIUM_RATIO
@@ -121,7 +133,10 @@ class CatFactoryConfig:
         self.MAX_ENTRY_TIME = MAX_ENTRY_TIME
         self.MIN_TIME_INSIDE = MIN_TIME_INSIDE
         self.MAX_TEST_TIME = MAX_TEST_TIME
-        self.RNG_CONFIG = RNG_CONFIG
+        # копия, чтобы костыль ниже не менял DEFAULT_RNG_CONFIG и конфиги не протекали друг в друга
+        self.RNG_CONFIG = thaw_rng_config(RNG_CONFIG)
+        self.ANALYTIC_TESTING = ANALYTIC_TESTING
+        self.RNG_BACKEND = RNG_BACKEND
     
 
         # костыли
@@ -136,6 +151,9 @@ class CatFactoryConfig:
             self.RNG_CONFIG['fabric_processing_time']['min_time'] = DETAIL_PROCESSING_TIME_OVERRIDE / 4
             self.RNG_CONFIG['fabric_processing_time']['max_time'] = DETAIL_PROCESSING_TIME_OVERRIDE * 3
 
+        self.RNG_SAMPLERS = compile_rng_config(self.RNG_CONFIG)
+        check_rng_backend(self.RNG_BACKEND)
+        self.RNG_CONFIG = freeze_rng_config(self.RNG_CONFIG)
 
         self.PLANNED_HOUSES_NUMS = {
             CatHouseType.PREMIUM: self.get_planned_premium_houses_num(),
@@ -147,6 +165,16 @@ class CatFactoryConfig:
             CatHouseType.PREMIUM: PremiumHouseSpec()
         }
 
+    def __getstate__(self):
+        # MappingProxyType не сериализуется pickle
+        state = dict(self.__dict__)
+        state["RNG_CONFIG"] = thaw_rng_config(self.RNG_CONFIG)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.RNG_CONFIG = freeze_rng_config(self.RNG_CONFIG)
+
     def get_planned_premium_houses_num(self):
         return int(self.PLANNED_HOUSES_NUM * self.PLANNED_PREMIUM_RATIO)
     
@@ -185,11 +213,13 @@ class HouseTestResult():
 # =============== #
 
 class CatHouseFactory:
-    def __init__(self, env: simpy.Environment, config: CatFactoryConfig, rng: CustomRNG, logging_on=False):
+    def __init__(self, env: simpy.Environment, config: CatFactoryConfig, rng: CustomRNG, logging_on=False, stats_mode=STATS_FULL):
         self.env = env
         self.rng = rng
         self.config = config
         self.logging_on = logging_on
+        # STATS_FULL - список словарей по домикам, STATS_COMPACT/STATS_SUMMARY - см. compactstats
+        self.stats_mode = stats_mode
 
         self.stats = []
 
@@ -204,9 +234,13 @@ class CatHouseFactory:
     def init(self):
         self.current_stats = {
             "execution_times_by_phase": dict(),
-            "house_testing_metas": [],
+            "house_testing_metas": make_house_testing_metas(self.stats_mode, self.config.MAX_TEST_TIME),
             "planned_houses_num": self.config.PLANNED_HOUSES_NUM
         }
+        if self.config.ANALYTIC_TESTING:
+            # точные вероятности продажи и ожидаемые длительности теста по каждому домику
+            self.current_stats["house_sale_probabilities"] = [] if self.stats_mode == STATS_FULL else array("d")
+            self.current_stats["house_expected_test_times"] = [] if self.stats_mode == STATS_FULL else array("d")
         self.raw_wood_planks = SortedList(key=lambda p: p.quality)
         self.raw_fabric_rolls = SortedList(key=lambda r: r.quality)
         self.paint_stock = SortedList(key=lambda r: r.quality)
@@ -240,6 +274,11 @@ class CatHouseFactory:
     def get_stats(self):
         return self.stats
 
+    def drain_stats(self):
+        # забрать накопленную статистику и не держать ее между вызовами run
+        stats, self.stats = self.stats, []
+        return stats
+
 
     def orchestrate(self):
         start_time = self.env.now
@@ -339,12 +378,14 @@ class CatHouseFactory:
         self.log(f"Начата закупка сырья")
 
         # расчет необходимых материалов
-        rng_config = self.config.RNG_CONFIG
+        samplers = self.config.RNG_SAMPLERS
         premium_houses_num = self.config.get_planned_premium_houses_num()
         standard_houses_num = self.config.get_planned_standard_houses_num()
         self.log(f"Запланировано {premium_houses_num} премиум и {standard_houses_num} стандартных домиков")
         
-        house_types = set(CatHouseType)
+        # порядок определения типов, а не set: от него зависит порядок розыгрыша качеств,
+        # а порядок set(Enum) меняется вместе с PYTHONHASHSEED
+        house_types = list(CatHouseType)
         house_specs = self.config.HOUSE_SPECS
         planned_houses_nums = self.config.PLANNED_HOUSES_NUMS
 
@@ -363,36 +404,27 @@ class CatHouseFactory:
             for house_type in house_types
         }
 
-        execution_time = int(self.rng.normal(
-            mu=rng_config["material_delivery_time"]["mu"],
-            sigma=rng_config["material_delivery_time"]["sigma"]))        
+        execution_time = int(samplers.material_delivery_time(self.rng))
         
         yield self.env.timeout(execution_time)
 
+        quality_samplers = samplers.raw_material_quality
+
         raw_wood_batch = [
             RawWoodPlank(
-                quality=self.rng.normal(
-                    mu=rng_config["raw_material_quality"][house_type]["mu"],
-                    sigma=rng_config["raw_material_quality"][house_type]["sigma"] 
-                )
+                quality=quality_samplers[house_type](self.rng)
             ) for house_type, cost in wood_costs.items() for _ in range(cost)
         ]
 
         raw_fabric_batch = [
             RawFabricRoll(
-                quality=self.rng.normal(
-                    mu=rng_config["raw_material_quality"][house_type]["mu"],
-                    sigma=rng_config["raw_material_quality"][house_type]["sigma"] 
-                )
+                quality=quality_samplers[house_type](self.rng)
             ) for house_type, cost in fabric_costs.items() for _ in range(cost)
         ]
 
         paint_batch = [
             PaintBucket(
-                quality=self.rng.normal(
-                    mu=rng_config["raw_material_quality"][house_type]["mu"],
-                    sigma=rng_config["raw_material_quality"][house_type]["sigma"] 
-                ),
+                quality=quality_samplers[house_type](self.rng),
                 color=self.rng.choice(list(Color))
             ) for house_type, cost in paint_costs.items() for _ in range(cost)
         ]
@@ -438,13 +470,14 @@ class CatHouseFactory:
 
 
     def has_mats_for_part(self, part_type, house_type):
-        is_premium = house_type in {CatHouseType.PREMIUM}
-        if part_type in set(WoodenPartType):
+        # isinstance вместо set(Enum): множество и хеши членов Enum считались на каждый вызов
+        is_premium = house_type == CatHouseType.PREMIUM
+        if isinstance(part_type, WoodenPartType):
             return (len(self.raw_wood_planks) > 0 
                 and (not is_premium or self.raw_wood_planks[-1].quality > self.config.MIN_PREMIUM_WOOD_QUALITY) 
                 and len(self.paint_stock) > 0 
                 and (not is_premium or self.paint_stock[-1].quality > self.config.MIN_PREMIUM_PAINT_QUALITY))
-        if part_type in set(FabricPartType):
+        if isinstance(part_type, FabricPartType):
             return (len(self.raw_fabric_rolls) > 0 
                 and (not is_premium or self.raw_fabric_rolls[-1].quality > self.config.MIN_PREMIUM_FABRIC_QUALITY) 
                 and len(self.paint_stock) > 0 
@@ -452,9 +485,9 @@ class CatHouseFactory:
         raise Exception(f"unrecognized part_type: {part_type}")
 
     def make_part(self, part_type):
-        if part_type in set(WoodenPartType):
+        if isinstance(part_type, WoodenPartType):
             return self.make_wooden_part(part_type)
-        if part_type in set(FabricPartType):
+        if isinstance(part_type, FabricPartType):
             return self.make_fabric_part(part_type)
         raise Exception(f"unrecognized part_type: {part_type}")
     
@@ -462,14 +495,8 @@ class CatHouseFactory:
     def make_fabric_part(self, part_type: FabricPartType):
         plank: RawFabricRoll = self.raw_fabric_rolls.pop()
         paint_bucket: PaintBucket = self.paint_stock.pop()
-        rng_config = self.config.RNG_CONFIG
-
-        execution_time = int(self.rng.truncated_normal(
-            mu=rng_config["fabric_processing_time"]["mu"],
-            sigma=rng_config["fabric_processing_time"]["sigma"],
-            a=rng_config["fabric_processing_time"]["min_time"],
-            b=rng_config["fabric_processing_time"]["max_time"],
-            ))        
+
+        execution_time = int(self.config.RNG_SAMPLERS.fabric_processing_time(self.rng))
         yield self.env.timeout(execution_time)
         
         # break logic
@@ -490,14 +517,8 @@ class CatHouseFactory:
     def make_wooden_part(self, part_type: WoodenPartType):
         plank: RawWoodPlank = self.raw_wood_planks.pop()
         paint_bucket: PaintBucket = self.paint_stock.pop()
-        rng_config = self.config.RNG_CONFIG
-
-        execution_time = int(self.rng.truncated_normal(
-            mu=rng_config["wooden_processing_time"]["mu"],
-            sigma=rng_config["wooden_processing_time"]["sigma"],
-            a=rng_config["wooden_processing_time"]["min_time"],
-            b=rng_config["wooden_processing_time"]["max_time"]
-            ))        
+
+        execution_time = int(self.config.RNG_SAMPLERS.wooden_processing_time(self.rng))
         yield self.env.timeout(execution_time)
         
         # break logic 
@@ -543,7 +564,7 @@ class CatHouseFactory:
             self.log(f"Смена сборщика завершена, задач на домик {house_type} больше нет")
 
     def build_house(self, house_type: CatHouseType):
-        rng_config = self.config.RNG_CONFIG
+        build_quality_samplers = self.config.RNG_SAMPLERS.house_build_quality
         house_spec = self.config.HOUSE_SPECS[house_type]
         part_types_to_get = house_spec.get_parts()
 
@@ -564,10 +585,7 @@ class CatHouseFactory:
             return self.env.event().succeed(HouseBuildResult.BROKEN_PARTS)
         
         if house_type == CatHouseType.PREMIUM:
-            build_quality = self.rng.normal(
-                mu=rng_config["house_build_quality"][CatHouseType.PREMIUM]["mu"],
-                sigma=rng_config["house_build_quality"][CatHouseType.PREMIUM]["sigma"]
-            )
+            build_quality = build_quality_samplers.premium(self.rng)
             self.built_houses[house_type].append(
                 PremiumCatHouse(
                     build_quality=build_quality,
@@ -575,10 +593,7 @@ class CatHouseFactory:
                 )
             )
         elif house_type == CatHouseType.STANDARD:
-            build_quality = self.rng.normal(
-                mu=rng_config["house_build_quality"][CatHouseType.STANDARD]["mu"],
-                sigma=rng_config["house_build_quality"][CatHouseType.STANDARD]["sigma"]
-            )
+            build_quality = build_quality_samplers.standard(self.rng)
             self.built_houses[house_type].append(
                 StandardCatHouse(
                     build_quality=build_quality,
@@ -620,7 +635,7 @@ class CatHouseFactory:
         
     
     def test_houses(self):
-        self.houses_to_test = [house for house_type in set(CatHouseType) for house in self.built_houses[house_type]]
+        self.houses_to_test = [house for house_type in CatHouseType for house in self.built_houses[house_type]]
         cats_jobs = [self.env.process(self.cat_job()) for _ in range(self.cats.capacity)]
         yield simpy.AllOf(self.env, cats_jobs)
 
@@ -634,26 +649,17 @@ class CatHouseFactory:
             self.log(f"Смена котика завершена, задач тестирование домиков больше нет")
 
     def test_house(self):
-        rng_config = self.config.RNG_CONFIG
+        samplers = self.config.RNG_SAMPLERS
         house: CatHouse = self.houses_to_test.pop()
         max_test_time = self.config.MAX_TEST_TIME
 
         qualities = [part.quality for part in house.parts] + [house.build_quality]
         overall_quality = math.prod(qualities) ** (1/len(qualities))
         
-        base_scale = rng_config["entry_timing"]["scale"]
-        base_multiplier = rng_config["entry_timing"]["base_multiplier"]
-        scale = base_scale / (base_multiplier - overall_quality)
-        entry_timing = min(max(int(self.rng.exponential(scale=scale)), 0), max_test_time)
+        entry_timing = min(max(int(samplers.entry_timing(self.rng, overall_quality)), 0), max_test_time)
         entry_timing = entry_timing if entry_timing <= self.config.MAX_ENTRY_TIME else None 
 
-        base_mu = rng_config["time_inside"]["base_mu"]
-        sigma = rng_config["time_inside"]["sigma"]
-        time_inside = min(max(
-            int(self.rng.normal(
-            mu=base_mu * overall_quality, 
-            sigma=sigma)
-            ), 0), max_test_time)
+        time_inside = min(max(int(samplers.time_inside(self.rng, overall_quality)), 0), max_test_time)
         time_inside = None if entry_timing is None else min(time_inside, max_test_time - entry_timing)
 
         yield self.env.timeout(max_test_time if entry_timing is None else entry_timing + time_inside)
@@ -665,13 +671,71 @@ class CatHouseFactory:
         house_test_result = self.make_test_result(house_test_meta)
         self.house_test_results[house_test_result.verdict].append(house)
 
-        self.current_stats["house_testing_metas"].append({
-            "entry_timing": entry_timing,
-            "time_inside": time_inside
-        })
+        if self.stats_mode == STATS_FULL:
+            self.current_stats["house_testing_metas"].append({
+                "entry_timing": entry_timing,
+                "time_inside": time_inside
+            })
+        else:
+            self.current_stats["house_testing_metas"].add(entry_timing, time_inside)
+
+        if self.config.ANALYTIC_TESTING:
+            sale_probability, expected_test_time = self.compute_test_expectations(overall_quality)
+            self.current_stats["house_sale_probabilities"].append(sale_probability)
+            self.current_stats["house_expected_test_times"].append(expected_test_time)
 
         return self.env.event().succeed()        
 
+    def compute_test_expectations(self, overall_quality):
+        # Rao-Blackwell: вердикт зависит только от качества домика и двух независимых
+        # розыгрышей (экспоненциальный заход, нормальное пребывание), поэтому
+        # вероятность продажи и ожидаемую длительность теста можно посчитать точно,
+        # с учетом целочисленного отсечения int() и ограничений по времени
+        samplers = self.config.RNG_SAMPLERS
+        max_test_time = self.config.MAX_TEST_TIME
+        max_entry_time = self.config.MAX_ENTRY_TIME
+        min_time_inside = self.config.MIN_TIME_INSIDE
+
+        # P(entry_timing = j), j = 0..max_test_time
+        scale = samplers.entry_timing.get_scale(overall_quality)
+        if scale > 0:
+            survival = [math.exp(-j / scale) for j in range(max_test_time + 1)]
+            entry_probs = [survival[j] - survival[j + 1] for j in range(max_test_time)] + [survival[max_test_time]]
+        else:
+            entry_probs = [1.0] + [0.0] * max_test_time
+
+        # P(time_inside_raw >= k), k = 0..max_test_time; int() отсекает к нулю, поэтому для k >= 1 это P(X >= k)
+        mu = samplers.time_inside.base_mu * overall_quality
+        sigma = samplers.time_inside.sigma
+        inside_tail = [1.0] + [
+            0.5 * math.erfc((k - mu) / (sigma * math.sqrt(2))) for k in range(1, max_test_time + 1)
+        ]
+
+        if min_time_inside <= 0:
+            stay_prob = 1.0
+        elif min_time_inside > max_test_time:
+            stay_prob = 0.0
+        else:
+            stay_prob = inside_tail[min_time_inside]
+
+        last_entry = min(max_entry_time, max_test_time)
+        last_passing_entry = min(last_entry, max_test_time - min_time_inside)
+        sale_probability = sum(entry_probs[:last_passing_entry + 1]) * stay_prob if last_passing_entry >= 0 else 0.0
+
+        # E[min(R, n)] = sum_{k=1..n} P(R >= k)
+        inside_cumsum = [0.0]
+        for k in range(1, max_test_time + 1):
+            inside_cumsum.append(inside_cumsum[-1] + inside_tail[k])
+
+        entered_prob = 0.0
+        expected_test_time = 0.0
+        for j in range(last_entry + 1):
+            entered_prob += entry_probs[j]
+            expected_test_time += entry_probs[j] * (j + inside_cumsum[max_test_time - j])
+        expected_test_time += (1 - entered_prob) * max_test_time
+
+        return sale_probability, expected_test_time
+
     def make_test_result(self, meta: HouseTestMeta):
         if meta.entry_timing is None:
             return HouseTestResult(
@@ -0,0 +1,107 @@
+from array import array
+
+# ============================= #
+#   КОМПАКТНАЯ СТАТИСТИКА ТЕСТОВ #
+# ============================= #
+# Вместо списка словарей {"entry_timing", "time_inside"} на каждый домик:
+# - STATS_COMPACT: два упакованных массива int32, None хранится как NONE_SENTINEL;
+#   итерация отдает те же словари, так что анализ из simulation.ipynb работает без изменений
+# - STATS_SUMMARY: только гистограммы значений (память не зависит от числа домиков)
+
+STATS_FULL = "full"
+STATS_COMPACT = "compact"
+STATS_SUMMARY = "summary"
+STATS_MODES = (STATS_FULL, STATS_COMPACT, STATS_SUMMARY)
+
+NONE_SENTINEL = -1
+
+
+def _pack(value):
+    return NONE_SENTINEL if value is None else value
+
+
+def _unpack(value):
+    return None if value == NONE_SENTINEL else value
+
+
+class HouseTestingMetas:
+    __slots__ = ("entry_timings", "time_insides")
+
+    def __init__(self):
+        self.entry_timings = array("i")
+        self.time_insides = array("i")
+
+    def add(self, entry_timing, time_inside):
+        self.entry_timings.append(_pack(entry_timing))
+        self.time_insides.append(_pack(time_inside))
+
+    def __len__(self):
+        return len(self.entry_timings)
+
+    def __getitem__(self, index):
+        return {
+            "entry_timing": _unpack(self.entry_timings[index]),
+            "time_inside": _unpack(self.time_insides[index]),
+        }
+
+    def __iter__(self):
+        for entry_timing, time_inside in zip(self.entry_timings, self.time_insides):
+            yield {"entry_timing": _unpack(entry_timing), "time_inside": _unpack(time_inside)}
+
+    def to_json(self):
+        return list(self)
+
+
+class HouseTestingSummary:
+    # гистограммы: индекс - значение, отдельно число None
+    __slots__ = ("count", "entry_timing_histogram", "time_inside_histogram", "no_entry_count")
+
+    def __init__(self, max_test_time):
+        self.count = 0
+        self.entry_timing_histogram = array("q", [0] * (max_test_time + 1))
+        self.time_inside_histogram = array("q", [0] * (max_test_time + 1))
+        self.no_entry_count = 0
+
+    def add(self, entry_timing, time_inside):
+        self.count += 1
+        if entry_timing is None:
+            self.no_entry_count += 1
+        else:
+            self.entry_timing_histogram[entry_timing] += 1
+            self.time_inside_histogram[time_inside] += 1
+
+    def __len__(self):
+        return self.count
+
+    def entry_timing_sum(self):
+        return sum(value * n for value, n in enumerate(self.entry_timing_histogram))
+
+    def time_inside_sum(self):
+        return sum(value * n for value, n in enumerate(self.time_inside_histogram))
+
+    def to_json(self):
+        return {
+            "count": self.count,
+            "no_entry_count": self.no_entry_count,
+            "entry_timing_histogram": list(self.entry_timing_histogram),
+            "time_inside_histogram": list(self.time_inside_histogram),
+        }
+
+
+def make_house_testing_metas(stats_mode, max_test_time):
+    if stats_mode == STATS_FULL:
+        return []
+    if stats_mode == STATS_COMPACT:
+        return HouseTestingMetas()
+    if stats_mode == STATS_SUMMARY:
+        return HouseTestingSummary(max_test_time)
+    raise ValueError(f"unrecognized stats_mode: {stats_mode}")
+
+
+def to_json(value):
+    # для json.dumps(..., default=to_json)
+    if isinstance(value, (HouseTestingMetas, HouseTestingSummary)):
+        return value.to_json()
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,240 @@
+import os
+import random
+from dataclasses import dataclass
+
+import numpy as np
+
+# ================================ #
+#   SIS-МОДЕЛЬ ПАНИКИ (ЛАБА 5)     #
+# ================================ #
+# sis_model - исходная версия из lab5.ipynb на словарях (эталон).
+# sis_model_csr - та же модель на numpy: граф один раз переводится в CSR, на каждом шаге
+# обрабатываются только ребра от паникующих узлов, а много прогонов идут одной матрицей
+# состояний (прогон x узел).
+#
+# Шаг в обеих версиях одинаковый: каждый паникующий узел заражает каждого спокойного соседа
+# с вероятностью p (то есть спокойный узел с m паникующими соседями заражается
+# с вероятностью 1 - (1 - p)^m), затем каждый паникующий успокаивается с вероятностью gamma.
+# Новые зараженные на этом же шаге не успокаиваются. Совпадение с эталоном - статистическое,
+# последовательности случайных чисел разные.
+#
+# Прогоны пачки идут либо на одном графе, либо каждый на своем: stack_csr склеивает графы
+# ансамбля в один блочно-диагональный, и sis_model_csr(..., stacked=True) ведет строку r
+# матрицы состояний по r-му блоку.
+
+STEPS = 30
+
+
+def sis_model(graph, seed_nodes, p=0.3, gamma=0.2, steps=STEPS):
+    # Состояние узлов: 0 = Susceptible, 1 = Infected
+    state = {node: 0 for node in graph.nodes}
+    for node in seed_nodes:
+        state[node] = 1
+    active = set(seed_nodes)
+    history = [len(active)]
+    step = 0
+
+    while step < steps:
+        next_state = state.copy()
+
+        newly_infected = set()
+        for node in active:
+            neighbors = set(graph.neighbors(node)) - newly_infected
+            for neighbor in neighbors:
+                if state[neighbor] == 0 and random.random() < p:
+                    newly_infected.add(neighbor)
+                    next_state[neighbor] = 1
+
+        newly_recovered = set()
+        for node in active:
+            if random.random() < gamma:
+                newly_recovered.add(node)
+                next_state[node] = 0
+
+        state = next_state
+        active = {node for node, s in state.items() if s == 1}
+        step += 1
+        history.append(len(active))
+    return state, history
+
+
+@dataclass(frozen=True)
+class CSRGraph:
+    # соседи узла i - indices[indptr[i]:indptr[i + 1]]; nodes[i] - исходная метка узла в networkx
+    indptr: np.ndarray
+    indices: np.ndarray
+    nodes: np.ndarray
+
+    @property
+    def num_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def node_indices(self, labels):
+        # метки networkx -> номера строк CSR
+        labels = np.asarray(labels)
+        if np.array_equal(self.nodes, np.arange(self.num_nodes)):
+            return labels.astype(np.int64)
+        order = np.argsort(self.nodes)
+        return order[np.searchsorted(self.nodes, labels, sorter=order)]
+
+
+def csr_from_edges(num_nodes, src, dst, nodes=None, directed=False):
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    if not directed:
+        # петля u-u в networkx дает одного соседа, поэтому ее не дублируем
+        loop = src == dst
+        src, dst = np.concatenate([src, dst[~loop]]), np.concatenate([dst, src[~loop]])
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+    indices = dst[order].astype(np.int32)
+    nodes = np.arange(num_nodes) if nodes is None else np.asarray(nodes)
+    return CSRGraph(indptr, indices, nodes)
+
+
+def graph_to_csr(graph):
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    num_edges = graph.number_of_edges()
+    edges = np.fromiter((index[node] for edge in graph.edges() for node in edge), dtype=np.int64, count=2 * num_edges)
+    edges = edges.reshape(num_edges, 2)
+    return csr_from_edges(len(nodes), edges[:, 0], edges[:, 1], nodes, graph.is_directed())
+
+
+def watts_strogatz_csr(N, k, beta, seed=None):
+    # аналог nx.watts_strogatz_graph на numpy - для графов, которые долго строить в networkx:
+    # кольцо, где каждое ребро (u, u + j) с вероятностью beta переносится на случайный узел.
+    # Петли перевыбираются, повторные ребра выбрасываются (их доля порядка k * beta / N)
+    rng = np.random.default_rng(seed)
+    src = np.tile(np.arange(N, dtype=np.int64), k // 2)
+    dst = (src + np.repeat(np.arange(1, k // 2 + 1, dtype=np.int64), N)) % N
+    rewired = np.flatnonzero(rng.random(len(src)) < beta)
+    while len(rewired):
+        dst[rewired] = rng.integers(0, N, len(rewired))
+        rewired = rewired[dst[rewired] == src[rewired]]
+    keys = np.unique(np.minimum(src, dst) * N + np.maximum(src, dst))
+    del src, dst
+    return csr_from_edges(N, keys // N, keys % N)
+
+
+def save_csr(csr, path):
+    # каталог с .npy; nodes сохраняются, только если это не 0..N-1
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "indptr.npy"), csr.indptr)
+    np.save(os.path.join(path, "indices.npy"), csr.indices)
+    if not np.array_equal(csr.nodes, np.arange(csr.num_nodes)):
+        np.save(os.path.join(path, "nodes.npy"), csr.nodes)
+
+
+def load_csr(path, mmap=True):
+    # mmap=True - массивы отображаются с диска и читаются по мере обращения,
+    # так что граф может быть больше оперативной памяти
+    mmap_mode = "r" if mmap else None
+    indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode=mmap_mode)
+    indices = np.load(os.path.join(path, "indices.npy"), mmap_mode=mmap_mode)
+    nodes_path = os.path.join(path, "nodes.npy")
+    nodes = np.load(nodes_path, mmap_mode=mmap_mode) if os.path.exists(nodes_path) else np.arange(len(indptr) - 1)
+    return CSRGraph(indptr, indices, nodes)
+
+
+def stack_csr(graphs):
+    # блочно-диагональный граф: узел i графа r становится узлом r * n + i
+    num_nodes = graphs[0].num_nodes
+    if any(graph.num_nodes != num_nodes for graph in graphs):
+        raise ValueError("all graphs in a stack must have the same number of nodes")
+    # строки CSR не отсортированы, поэтому проверяем наибольший возможный номер узла, а не indices[-1]
+    if len(graphs) * num_nodes - 1 > np.iinfo(np.int32).max:
+        raise ValueError("stacked graph does not fit int32 indices")
+    edge_offsets = np.cumsum([0] + [len(graph.indices) for graph in graphs])
+    indptr = np.concatenate([[0]] + [graph.indptr[1:] + edge_offsets[r] for r, graph in enumerate(graphs)])
+    indices = np.concatenate([graph.indices.astype(np.int64) + r * num_nodes for r, graph in enumerate(graphs)])
+    nodes = np.concatenate([graph.nodes for graph in graphs])
+    return CSRGraph(indptr, indices.astype(np.int32), nodes)
+
+
+def hub_nodes(csr, count):
+    # узлы с наибольшей степенью; при равной степени - в порядке узлов, как sorted(graph.degree, ...) в lab5
+    return np.argsort(-csr.degrees, kind="stable")[:count]
+
+
+def remove_hubs_csr(csr, fraction=0.05):
+    # remove_hubs из lab5 для CSR: узлы перенумеровываются, nodes хранит исходные метки
+    keep = np.ones(csr.num_nodes, dtype=bool)
+    keep[hub_nodes(csr, int(fraction * csr.num_nodes))] = False
+    new_index = np.cumsum(keep) - 1
+    src = np.repeat(np.arange(csr.num_nodes), csr.degrees)
+    mask = keep[src] & keep[csr.indices]
+    src, dst = new_index[src[mask]], new_index[csr.indices[mask]]
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(indptr) - 1), out=indptr[1:])
+    return CSRGraph(indptr, dst[order].astype(np.int32), csr.nodes[keep])
+
+
+def random_seed_nodes(num_nodes, s, runs, rng=None):
+    # s разных начальных узлов на каждый прогон (как random.sample в lab5)
+    rng = np.random.default_rng(rng)
+    return np.stack([rng.choice(num_nodes, size=s, replace=False) for _ in range(runs)])
+
+
+def _frontier_edges(csr, nodes):
+    # (номер активного узла в nodes, сосед) для всех ребер активных узлов
+    starts = csr.indptr[nodes]
+    degrees = csr.indptr[nodes + 1] - starts
+    total = int(degrees.sum())
+    owners = np.repeat(np.arange(len(nodes)), degrees)
+    offsets = np.arange(total) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+    return owners, csr.indices[starts[owners] + offsets]
+
+
+def sis_model_csr(csr, seed_nodes, p=0.3, gamma=0.2, steps=STEPS, rng=None, stacked=False):
+    # seed_nodes: (runs, s) номеров узлов графа - по строке на прогон
+    # stacked=True: csr - stack_csr из runs графов, прогон r идет по своему графу
+    # возвращает (состояния после steps шагов, bool runs x N; число паникующих по шагам, runs x (steps + 1))
+    rng = np.random.default_rng(rng)
+    seed_nodes = np.atleast_2d(np.asarray(seed_nodes, dtype=np.int64))
+    runs = len(seed_nodes)
+    if stacked and csr.num_nodes % runs:
+        raise ValueError("stacked graph size must be a multiple of the number of runs")
+    num_nodes = csr.num_nodes // runs if stacked else csr.num_nodes
+
+    state = np.zeros((runs, num_nodes), dtype=bool)
+    state[np.arange(runs)[:, None], seed_nodes] = True
+    flat_state = state.reshape(-1)
+    history = np.zeros((runs, steps + 1), dtype=np.int64)
+    history[:, 0] = state.sum(axis=1)
+
+    for step in range(1, steps + 1):
+        active = np.flatnonzero(flat_state)
+        if len(active) == 0:
+            # все успокоились - дальше ничего не меняется
+            history[:, step:] = history[:, step - 1:step]
+            break
+
+        if stacked:
+            # номера узлов склеенного графа совпадают с индексами плоской матрицы состояний
+            _, targets = _frontier_edges(csr, active)
+            targets = targets.astype(np.int64)
+        else:
+            owners, neighbors = _frontier_edges(csr, active % num_nodes)
+            # сосед в том же прогоне (той же строке матрицы), что и активный узел
+            row_offsets = active - active % num_nodes
+            targets = row_offsets[owners] + neighbors
+        targets = targets[~flat_state[targets]]
+        infected = targets[rng.random(len(targets)) < p]
+
+        recovered = active[rng.random(len(active)) < gamma]
+        flat_state[recovered] = False
+        flat_state[infected] = True
+
+        history[:, step] = state.sum(axis=1)
+
+    return state, history
@@ -0,0 +1,177 @@
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import networkx as nx
+import numpy as np
+
+from contagion import STEPS, CSRGraph, graph_to_csr, random_seed_nodes, remove_hubs_csr, sis_model_csr, stack_csr
+
+# ====================================== #
+#   СЕТКА ЭКСПЕРИМЕНТОВ LAB5 ПАРАЛЛЕЛЬНО #
+# ====================================== #
+# Графы Уоттса-Строгаца строятся один раз на (N, k, beta, seed) и кешируются: ансамбль из
+# runs графов общий для всех p/gamma/s и для стратегий (remove_hubs, хабы как seeds).
+# Точки сетки считаются в процессах, склеенные ансамбли (stack_csr) передаются воркерам
+# через shared memory, а не копируются в каждую задачу.
+#
+# Сиды: из seed через SeedSequence выводятся сиды графов ансамбля (по номеру прогона)
+# и генераторы точек сетки (по параметрам точки), поэтому результат точки не зависит
+# от числа воркеров, порядка выполнения и состава сетки.
+
+# Параметры модели (как в lab5.ipynb)
+N = 1000
+K_VALUES = [4, 8, 12]
+P_VALUES = [0.1, 0.3, 0.5]
+GAMMA_VALUES = [0.2, 0.5]
+S_VALUES = [1, 5, 10]
+BETA = 0.1
+RUNS = 10
+DEFAULT_SEED = 12345
+HUBS_FRACTION = 0.05
+
+STRATEGY_RANDOM = "random"            # случайные начальные узлы
+STRATEGY_REMOVE_HUBS = "remove_hubs"  # сдерживание: без 5% хабов
+STRATEGY_HUB_SEEDS = "hub_seeds"      # ускорение: хабы как начальные узлы
+STRATEGIES = (STRATEGY_RANDOM, STRATEGY_REMOVE_HUBS, STRATEGY_HUB_SEEDS)
+
+# потоки SeedSequence
+GRAPH_STREAM = 0
+POINT_STREAM = 1
+
+_GRAPH_CACHE = dict()
+
+
+def graph_seeds(seed, runs):
+    return [int(np.random.SeedSequence(seed, spawn_key=(GRAPH_STREAM, run)).generate_state(1)[0]) for run in range(runs)]
+
+
+def point_rng(seed, k, p, gamma, s, strategy):
+    point_key = zlib.crc32(repr((k, float(p), float(gamma), s, strategy)).encode())
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(POINT_STREAM, point_key)))
+
+
+def cached_graph(N, k, beta, seed):
+    key = (N, k, beta, seed)
+    if key not in _GRAPH_CACHE:
+        _GRAPH_CACHE[key] = graph_to_csr(nx.watts_strogatz_graph(N, k, beta, seed=seed))
+    return _GRAPH_CACHE[key]
+
+
+def clear_graph_cache():
+    _GRAPH_CACHE.clear()
+
+
+def graph_ensemble(N, k, beta=BETA, runs=RUNS, seed=DEFAULT_SEED, strategy=STRATEGY_RANDOM):
+    graphs = [cached_graph(N, k, beta, graph_seed) for graph_seed in graph_seeds(seed, runs)]
+    if strategy == STRATEGY_REMOVE_HUBS:
+        graphs = [remove_hubs_csr(graph, HUBS_FRACTION) for graph in graphs]
+    return graphs
+
+
+def _ensemble_strategy(strategy):
+    # хабы как seeds считаются на исходном ансамбле
+    return STRATEGY_REMOVE_HUBS if strategy == STRATEGY_REMOVE_HUBS else STRATEGY_RANDOM
+
+
+def experiment_key(k, p, gamma, s, strategy=STRATEGY_RANDOM):
+    # ключи results из lab5.ipynb
+    key = f"k={k}, p={p}, gamma={gamma}, s={s}"
+    return key if strategy == STRATEGY_RANDOM else f"{key}, strategy={strategy}"
+
+
+def simulate_point(stacked, runs, p, gamma, s, strategy, steps, rng):
+    # stacked - склеенный ансамбль из runs графов; возвращает (средний охват, средняя история)
+    num_nodes = stacked.num_nodes // runs
+    if strategy == STRATEGY_HUB_SEEDS:
+        degrees = stacked.degrees.reshape(runs, num_nodes)
+        seed_nodes = np.argsort(-degrees, axis=1, kind="stable")[:, :s]
+    else:
+        seed_nodes = random_seed_nodes(num_nodes, s, runs, rng)
+    state, history = sis_model_csr(stacked, seed_nodes, p, gamma, steps, rng, stacked=True)
+    return float(state.sum(axis=1).mean()), history.mean(axis=0).tolist()
+
+
+def run_experiment(N, k, p, gamma, s, runs=RUNS, steps=STEPS, beta=BETA, seed=DEFAULT_SEED, strategy=STRATEGY_RANDOM):
+    # то же, что run_experiment в lab5.ipynb, но на кешированном ансамбле графов
+    stacked = stack_csr(graph_ensemble(N, k, beta, runs, seed, _ensemble_strategy(strategy)))
+    return simulate_point(stacked, runs, p, gamma, s, strategy, steps, point_rng(seed, k, p, gamma, s, strategy))
+
+
+# ---------- shared memory ----------
+
+def share_graph(csr):
+    # indptr (int64) и indices (int32) одним блоком; воркеру передается только описание
+    size = csr.indptr.nbytes + csr.indices.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    np.ndarray(csr.indptr.shape, dtype=np.int64, buffer=shm.buf)[:] = csr.indptr
+    np.ndarray(csr.indices.shape, dtype=np.int32, buffer=shm.buf, offset=csr.indptr.nbytes)[:] = csr.indices
+    return shm, (shm.name, len(csr.indptr), len(csr.indices))
+
+
+_ATTACHED = dict()
+
+
+def attach_graph(descriptor):
+    # в воркере блок открывается один раз и переиспользуется всеми задачами
+    if descriptor not in _ATTACHED:
+        name, indptr_size, indices_size = descriptor
+        shm = shared_memory.SharedMemory(name=name)
+        indptr = np.ndarray((indptr_size,), dtype=np.int64, buffer=shm.buf)
+        indices = np.ndarray((indices_size,), dtype=np.int32, buffer=shm.buf, offset=indptr.nbytes)
+        _ATTACHED[descriptor] = (shm, CSRGraph(indptr, indices, np.arange(indptr_size - 1)))
+    return _ATTACHED[descriptor][1]
+
+
+def _run_point(descriptor, runs, p, gamma, s, strategy, steps, rng):
+    return simulate_point(attach_graph(descriptor), runs, p, gamma, s, strategy, steps, rng)
+
+
+def grid_points(k_values=K_VALUES, p_values=P_VALUES, gamma_values=GAMMA_VALUES, s_values=S_VALUES, strategies=(STRATEGY_RANDOM,)):
+    return [
+        (k, p, gamma, s, strategy)
+        for strategy in strategies for k in k_values for p in p_values for gamma in gamma_values for s in s_values
+    ]
+
+
+def run_grid(points=None, N=N, runs=RUNS, steps=STEPS, beta=BETA, seed=DEFAULT_SEED, workers=1):
+    # points - список (k, p, gamma, s, strategy), по умолчанию сетка lab5
+    # возвращает {experiment_key: {'size': ..., 'history': [...]}} как results в lab5.ipynb
+    points = grid_points() if points is None else points
+    ensembles = dict()
+    for k, p, gamma, s, strategy in points:
+        ensemble_key = (k, _ensemble_strategy(strategy))
+        if ensemble_key not in ensembles:
+            ensembles[ensemble_key] = stack_csr(graph_ensemble(N, k, beta, runs, seed, ensemble_key[1]))
+
+    tasks = [
+        (experiment_key(k, p, gamma, s, strategy), (k, _ensemble_strategy(strategy)), (runs, p, gamma, s, strategy, steps, point_rng(seed, k, p, gamma, s, strategy)))
+        for k, p, gamma, s, strategy in points
+    ]
+
+    results = dict()
+    if workers <= 1:
+        for key, ensemble_key, args in tasks:
+            avg_size, avg_history = simulate_point(ensembles[ensemble_key], *args)
+            results[key] = {'size': avg_size, 'history': avg_history}
+        return results
+
+    shared = {ensemble_key: share_graph(stacked) for ensemble_key, stacked in ensembles.items()}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {key: executor.submit(_run_point, shared[ensemble_key][1], *args) for key, ensemble_key, args in tasks}
+            for key, future in futures.items():
+                avg_size, avg_history = future.result()
+                results[key] = {'size': avg_size, 'history': avg_history}
+    finally:
+        for shm, _ in shared.values():
+            shm.close()
+            shm.unlink()
+    return results
+
+
+def compare_strategies(k=8, p=0.3, gamma=0.2, s=5, N=N, runs=RUNS, steps=STEPS, beta=BETA, seed=DEFAULT_SEED, workers=1):
+    # сравнение стратегий из lab5 на одном и том же ансамбле графов
+    points = [(k, p, gamma, s, strategy) for strategy in STRATEGIES]
+    results = run_grid(points, N, runs, steps, beta, seed, workers)
+    return {strategy: results[experiment_key(k, p, gamma, s, strategy)] for strategy in STRATEGIES}
@@ -1,51 +1,115 @@
 import math
 import time
+from abc import ABC, abstractmethod
+import numpy as np
 from scipy.special import erf, erfinv
 
-class CustomRNG:
-    # Реализован как LCG генератор
-    m: int      # модуль
-    a: int      # множитель
-    c: int      # инкремент 
-    state: int  # текущее состояние
-    def __init__(self, seed=None):
-        self.m = 2**32
-        self.a = 1664525 
-        self.c = 1013904223
-        self.state = seed if seed is not None else int(time.time() * 1000) % self.m
-    
+class CustomRNG(ABC):
+    # Интерфейс генератора: распределения строятся поверх uniform() конкретного бэкенда.
+    # CustomRNG(seed) по-прежнему дает LCG, CustomRNG(seed, backend="pcg64") - другой бэкенд
+    def __new__(cls, seed=None, backend="lcg", **kwargs):
+        if cls is CustomRNG:
+            check_rng_backend(backend)
+            cls = RNG_BACKENDS[backend]
+        return super().__new__(cls)
+
+    @abstractmethod
     def uniform(self, a=0, b=1):
-        self.state = (self.a * self.state + self.c) % self.m
-        return a + self.state / self.m * (b - a)
-    
+        ...
+
     def randint(self, a, b):
         return a + int(self.uniform() * (b - a + 1))
-    
+
     def choice(self, sequence):
         return sequence[int(self.uniform() * len(sequence))]
-    
+
     def exponential(self, scale):
         u = 1 - self.uniform() # избегаем 0
         return -scale * math.log(u)
-    
+
     def normal(self, mu, sigma):
-        u1 = 1 - self.uniform() 
+        u1 = 1 - self.uniform()
         u2 = self.uniform()
         z0 = math.sqrt(-2 * math.log(u1)) * math.cos(2 * math.pi * u2)
         return mu + z0 * sigma
-    
+
     def truncated_normal(self, mu, sigma, a, b):
         if a >= b:
             raise ValueError("Upper bound must be greater than lower bound")
-        
+
         alpha = (a - mu) / sigma
         beta = (b - mu) / sigma
-        
+
         phi_alpha = 0.5 * (1 + erf(alpha / math.sqrt(2)))
         phi_beta = 0.5 * (1 + erf(beta / math.sqrt(2)))
-        
+
         u = self.uniform()
         phi_u = phi_alpha + u * (phi_beta - phi_alpha)
-        
+
         z = math.sqrt(2) * erfinv(2 * phi_u - 1)
-        return mu + z * sigma
\ No newline at end of file
+        return mu + z * sigma
+
+
+class LCGRNG(CustomRNG):
+    # Реализован как LCG генератор (прежний CustomRNG, для воспроизведения старых результатов)
+    m: int      # модуль
+    a: int      # множитель
+    c: int      # инкремент
+    state: int  # текущее состояние
+    def __init__(self, seed=None, backend="lcg"):
+        self.m = 2**32
+        self.a = 1664525
+        self.c = 1013904223
+        self.state = seed if seed is not None else int(time.time() * 1000) % self.m
+
+    def uniform(self, a=0, b=1):
+        self.state = (self.a * self.state + self.c) % self.m
+        return a + self.state / self.m * (b - a)
+
+
+class NumpyRNG(CustomRNG):
+    # PCG64/Philox из numpy: равномерные числа генерируются блоками, а отдаются по одному
+    BIT_GENERATORS = {
+        "pcg64": np.random.PCG64,
+        "philox": np.random.Philox,
+    }
+    BLOCK_SIZE = 8192
+
+    def __init__(self, seed=None, backend="pcg64", block_size=BLOCK_SIZE):
+        self.generator = np.random.Generator(self.BIT_GENERATORS[backend](seed))
+        self.block_size = block_size
+        self.buffer = []
+        self.index = block_size
+
+    def refill(self):
+        self.buffer = self.generator.random(self.block_size).tolist()
+        self.index = 0
+
+    def uniform(self, a=0, b=1):
+        if self.index == self.block_size:
+            self.refill()
+        u = self.buffer[self.index]
+        self.index += 1
+        return a + u * (b - a)
+
+
+RNG_BACKENDS = {
+    "lcg": LCGRNG,
+    "pcg64": NumpyRNG,
+    "philox": NumpyRNG,
+}
+
+
+def check_rng_backend(backend):
+    if backend not in RNG_BACKENDS:
+        raise ValueError(f"unknown RNG backend {backend!r}, expected one of {sorted(RNG_BACKENDS)}")
+
+
+def benchmark_rng(backend, draws=1_000_000, seed=12345):
+    # равномерных чисел в секунду через скалярный интерфейс
+    rng = CustomRNG(seed, backend=backend)
+    uniform = rng.uniform
+    start = time.perf_counter()
+    for _ in range(draws):
+        uniform()
+    return draws / (time.perf_counter() - start)
@@ -6,6 +6,12 @@ from enum import Enum
 #  МОДЕЛИ ДАННЫХ  #
 # =============== #
 
+class FastHashEnum(Enum):
+    # Enum.__hash__ написан на питоне (hash(self._name_)), а члены этих Enum - ключи словарей
+    # в горячих местах модели. Члены Enum - синглтоны и сравниваются по идентичности,
+    # поэтому хеш по идентичности корректен и считается в C
+    __hash__ = object.__hash__
+
 @dataclass
 class RawWoodPlank:
     quality: float
@@ -34,7 +40,7 @@ class CatHousePart():
             raise Exception("no type")
         return self.type
     
-class WoodenPartType(Enum):
+class WoodenPartType(FastHashEnum):
     TYPE1 = 1
     TYPE2 = 2
     TYPE3 = 3
@@ -44,7 +50,7 @@ class WoodenHousePart(CatHousePart):
     type: WoodenPartType
 
 
-class FabricPartType(Enum):
+class FabricPartType(FastHashEnum):
     TYPE1 = 1
     TYPE2 = 2
 
@@ -109,7 +115,7 @@ class StandardHouseSpec(CatHouseSpec):
         min_quality = None
         super().__init__(parts, min_quality)
 
-class CatHouseType(Enum):
+class CatHouseType(FastHashEnum):
     STANDARD = 1
     PREMIUM = 2
 
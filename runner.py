@@ -0,0 +1,67 @@
+import random
+
+import simpy
+
+from cathousefactory import CatHouseFactory, CatFactoryConfig
+from compactstats import STATS_FULL
+from customrng import CustomRNG
+from models import CatHouseType
+from statsprocessing import extract_business_metrics
+
+# ================== #
+#   ЗАПУСК ПРОГОНОВ  #
+# ================== #
+
+DEFAULT_SEED = 12345
+DEFAULT_REPLICATIONS = 99
+REPLICATION_TIME = 100000
+# поля статистики прогона, которых хватает для extract_base_metrics/extract_business_metrics
+SUMMARY_STATS_KEYS = ("total_execution_time", "for_sale", "for_utilization", "planned_houses_num")
+
+
+def config_from_params(params):
+    # параметры из JSON/TOML: ключи типов домиков в RNG_CONFIG приходят строками ("STANDARD"/"PREMIUM")
+    params = dict(params)
+    if "RNG_CONFIG" in params:
+        params["RNG_CONFIG"] = {
+            name: {
+                (CatHouseType[key] if isinstance(key, str) and key in CatHouseType.__members__ else key): value
+                for key, value in section.items()
+            }
+            for name, section in params["RNG_CONFIG"].items()
+        }
+    return CatFactoryConfig(**params)
+
+
+def chunk_seed(seed, chunk_index):
+    # сид для i-й пачки прогонов, нулевая пачка совпадает с обычным запуском
+    return (seed + chunk_index * 0x9E3779B9) % 2**32
+
+
+def summarize_stats(stats):
+    return [{key: stat[key] for key in SUMMARY_STATS_KEYS} for stat in stats]
+
+
+def run_simulation(config: CatFactoryConfig, seed=DEFAULT_SEED, replications=DEFAULT_REPLICATIONS, stats_mode=STATS_FULL, rng_backend=None):
+    # то же самое, что run_simulation из ноутбуков lab3/lab4
+    return list(iter_simulation(config, seed, replications, stats_mode, rng_backend))
+
+
+def iter_simulation(config: CatFactoryConfig, seed=DEFAULT_SEED, replications=DEFAULT_REPLICATIONS, stats_mode=STATS_FULL, rng_backend=None):
+    # статистика каждого прогона отдается сразу после его завершения и в фабрике не копится
+    # rng_backend переопределяет config.RNG_BACKEND
+    # модель берет качество обработки и время сборки из глобального random - фиксируем и его,
+    # чтобы прогоны с одним сидом повторялись (генераторы iter_simulation не стоит чередовать)
+    random.seed(seed)
+    rng = CustomRNG(seed, backend=rng_backend or config.RNG_BACKEND)
+    env = simpy.Environment()
+    factory = CatHouseFactory(env, config, rng, stats_mode=stats_mode)
+
+    for i in range(1, replications + 1):
+        factory.run(until=i * REPLICATION_TIME)
+        yield from factory.drain_stats()
+
+
+def simulate_business_metrics(params, seed=DEFAULT_SEED, replications=DEFAULT_REPLICATIONS):
+    config = config_from_params(params)
+    return extract_business_metrics(run_simulation(config, seed, replications))
@@ -0,0 +1,181 @@
+import math
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from numbers import Real
+from types import MappingProxyType
+
+from scipy.special import erf, erfinv
+
+from customrng import CustomRNG
+from models import CatHouseType
+
+# ===================================== #
+#   СКОМПИЛИРОВАННЫЕ СЕМПЛЕРЫ RNG_CONFIG #
+# ===================================== #
+# RNG_CONFIG проверяется и один раз превращается в неизменяемые объекты с заранее
+# посчитанными константами; горячие места модели вызывают их напрямую, без вложенных
+# словарей. Объекты хешируемые (можно использовать как ключ кеша) и легко пиклятся.
+# Результаты совпадают с прямыми вызовами CustomRNG бит в бит.
+
+SQRT2 = math.sqrt(2)
+
+
+@dataclass(frozen=True)
+class NormalSampler:
+    mu: float
+    sigma: float
+
+    def __call__(self, rng: CustomRNG):
+        return rng.normal(self.mu, self.sigma)
+
+
+@dataclass(frozen=True)
+class TruncatedNormalSampler:
+    mu: float
+    sigma: float
+    min_time: float
+    max_time: float
+    phi_alpha: float = field(init=False, repr=False, compare=False)
+    phi_span: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # то же, что CustomRNG.truncated_normal, но CDF границ считаются один раз
+        phi_alpha = 0.5 * (1 + erf(((self.min_time - self.mu) / self.sigma) / SQRT2))
+        phi_beta = 0.5 * (1 + erf(((self.max_time - self.mu) / self.sigma) / SQRT2))
+        object.__setattr__(self, "phi_alpha", phi_alpha)
+        object.__setattr__(self, "phi_span", phi_beta - phi_alpha)
+
+    def __call__(self, rng: CustomRNG):
+        phi_u = self.phi_alpha + rng.uniform() * self.phi_span
+        return self.mu + SQRT2 * erfinv(2 * phi_u - 1) * self.sigma
+
+
+@dataclass(frozen=True)
+class EntryTimingSampler:
+    # время до захода котика, экспоненциальное с масштабом scale / (base_multiplier - качество)
+    scale: float
+    base_multiplier: float
+
+    def get_scale(self, quality):
+        return self.scale / (self.base_multiplier - quality)
+
+    def __call__(self, rng: CustomRNG, quality):
+        return rng.exponential(scale=self.scale / (self.base_multiplier - quality))
+
+
+@dataclass(frozen=True)
+class TimeInsideSampler:
+    # время внутри домика, нормальное со средним base_mu * качество
+    base_mu: float
+    sigma: float
+
+    def __call__(self, rng: CustomRNG, quality):
+        return rng.normal(mu=self.base_mu * quality, sigma=self.sigma)
+
+
+@dataclass(frozen=True)
+class HouseTypeSamplers:
+    standard: NormalSampler
+    premium: NormalSampler
+
+    def __getitem__(self, house_type: CatHouseType):
+        if house_type == CatHouseType.STANDARD:
+            return self.standard
+        if house_type == CatHouseType.PREMIUM:
+            return self.premium
+        raise KeyError(house_type)
+
+
+@dataclass(frozen=True)
+class RNGSamplers:
+    material_delivery_time: NormalSampler
+    wooden_processing_time: TruncatedNormalSampler
+    fabric_processing_time: TruncatedNormalSampler
+    raw_material_quality: HouseTypeSamplers
+    house_build_quality: HouseTypeSamplers
+    entry_timing: EntryTimingSampler
+    time_inside: TimeInsideSampler
+
+
+def freeze_rng_config(rng_config):
+    # RNG_CONFIG только для чтения: модель читает RNG_SAMPLERS, правки словаря после
+    # создания конфига ни на что бы не влияли
+    return MappingProxyType({
+        key: freeze_rng_config(value) if isinstance(value, Mapping) else value
+        for key, value in rng_config.items()
+    })
+
+
+def thaw_rng_config(rng_config):
+    # глубокая копия в обычные dict (в том числе из замороженного RNG_CONFIG другого конфига)
+    return {
+        key: thaw_rng_config(value) if isinstance(value, Mapping) else value
+        for key, value in rng_config.items()
+    }
+
+
+def _get_number(section, key, path):
+    if not isinstance(section, Mapping) or key not in section:
+        raise ValueError(f"RNG_CONFIG: missing {path}.{key}")
+    value = section[key]
+    if not isinstance(value, Real) or isinstance(value, bool) or math.isnan(value):
+        raise ValueError(f"RNG_CONFIG: {path}.{key} must be a number, got {value!r}")
+    return value
+
+
+def _get_section(rng_config, key, path):
+    if not isinstance(rng_config, Mapping) or key not in rng_config:
+        raise ValueError(f"RNG_CONFIG: missing {path}{key}")
+    return rng_config[key]
+
+
+def _compile_normal(section, path):
+    sampler = NormalSampler(_get_number(section, "mu", path), _get_number(section, "sigma", path))
+    if sampler.sigma <= 0:
+        raise ValueError(f"RNG_CONFIG: {path}.sigma must be > 0")
+    return sampler
+
+
+def _compile_truncated_normal(section, path):
+    mu = _get_number(section, "mu", path)
+    sigma = _get_number(section, "sigma", path)
+    min_time = _get_number(section, "min_time", path)
+    max_time = _get_number(section, "max_time", path)
+    if sigma <= 0:
+        raise ValueError(f"RNG_CONFIG: {path}.sigma must be > 0")
+    if min_time >= max_time:
+        raise ValueError(f"RNG_CONFIG: {path}.min_time must be less than max_time")
+    return TruncatedNormalSampler(mu, sigma, min_time, max_time)
+
+
+def _compile_house_types(section, path):
+    return HouseTypeSamplers(
+        standard=_compile_normal(_get_section(section, CatHouseType.STANDARD, f"{path}."), f"{path}.STANDARD"),
+        premium=_compile_normal(_get_section(section, CatHouseType.PREMIUM, f"{path}."), f"{path}.PREMIUM"),
+    )
+
+
+def compile_rng_config(rng_config) -> RNGSamplers:
+    entry_timing = _get_section(rng_config, "entry_timing", "")
+    time_inside = _get_section(rng_config, "time_inside", "")
+    samplers = RNGSamplers(
+        material_delivery_time=_compile_normal(
+            _get_section(rng_config, "material_delivery_time", ""), "material_delivery_time"),
+        wooden_processing_time=_compile_truncated_normal(
+            _get_section(rng_config, "wooden_processing_time", ""), "wooden_processing_time"),
+        fabric_processing_time=_compile_truncated_normal(
+            _get_section(rng_config, "fabric_processing_time", ""), "fabric_processing_time"),
+        raw_material_quality=_compile_house_types(
+            _get_section(rng_config, "raw_material_quality", ""), "raw_material_quality"),
+        house_build_quality=_compile_house_types(
+            _get_section(rng_config, "house_build_quality", ""), "house_build_quality"),
+        entry_timing=EntryTimingSampler(
+            _get_number(entry_timing, "scale", "entry_timing"),
+            _get_number(entry_timing, "base_multiplier", "entry_timing")),
+        time_inside=TimeInsideSampler(
+            _get_number(time_inside, "base_mu", "time_inside"),
+            _get_number(time_inside, "sigma", "time_inside")),
+    )
+    if samplers.time_inside.sigma <= 0:
+        raise ValueError("RNG_CONFIG: time_inside.sigma must be > 0")
+    return samplers
@@ -0,0 +1,271 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from compactstats import STATS_SUMMARY
+from runner import DEFAULT_REPLICATIONS, DEFAULT_SEED, chunk_seed, config_from_params, run_simulation, summarize_stats
+from statsprocessing import extract_base_metrics, extract_business_metrics
+
+# ========================= #
+#   ЛОКАЛЬНЫЙ СЕРВИС ЗАДАЧ  #
+# ========================= #
+# Долгоживущий процесс с заранее прогретыми воркерами: импорты simpy/scipy/sortedcontainers
+# и первый прогон оплачиваются один раз при старте, а не в каждом интерпретаторе.
+#
+# POST /jobs  {"config": {...параметры CatFactoryConfig...}, "seed": 12345, "replications": 99}
+# ответ - NDJSON поток накопленных метрик по мере готовности пачек прогонов.
+# Одинаковые задачи, которые уже считаются, не запускаются повторно - клиент
+# подписывается на уже идущую.
+
+DEFAULT_CHUNK_SIZE = 10
+DEFAULT_PORT = 8765
+
+
+def _warm_worker():
+    # прогрев: импорты и один короткий прогон в каждом воркере
+    run_simulation(config_from_params({"PLANNED_HOUSES_NUM": 2}), replications=1)
+
+
+def _run_chunk(params, seed, chunk_index, replications):
+    config = config_from_params(params)
+    return summarize_stats(run_simulation(config, chunk_seed(seed, chunk_index), replications, STATS_SUMMARY))
+
+
+def validate_job(params, seed, replications):
+    if not isinstance(seed, int) or isinstance(seed, bool):
+        raise ValueError(f"seed must be an integer, got {seed!r}")
+    if not isinstance(replications, int) or isinstance(replications, bool) or replications <= 0:
+        raise ValueError(f"replications must be a positive integer, got {replications!r}")
+    if not isinstance(params, dict):
+        raise ValueError("config must be a JSON object")
+    try:
+        config_from_params(params)
+    except Exception as error:
+        raise ValueError(f"invalid config: {error!r}") from error
+
+
+def job_key(params, seed, replications):
+    return json.dumps({"config": params, "seed": seed, "replications": replications}, sort_keys=True)
+
+
+class SimulationJob:
+    def __init__(self, key, replications):
+        self.key = key
+        self.replications = replications
+        self.records = []
+        self.snapshots = []
+        self.error = None
+        self.done = False
+        self.pending_chunks = 0
+        self.condition = threading.Condition()
+
+    def publish(self, records):
+        with self.condition:
+            if self.done:
+                return
+            self.records.extend(records)
+            self.snapshots.append({
+                "completed": len(self.records),
+                "replications": self.replications,
+                "base_metrics": extract_base_metrics(self.records),
+                "business_metrics": extract_business_metrics(self.records),
+            })
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        with self.condition:
+            self.error = error
+            self.done = True
+            self.condition.notify_all()
+
+    def stream(self):
+        # снапшоты с начала задачи, в т.ч. для подписавшихся позже
+        index = 0
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.snapshots) > index or self.done)
+                snapshots = self.snapshots[index:]
+                done, error = self.done, self.error
+            for snapshot in snapshots:
+                yield snapshot
+            index += len(snapshots)
+            if done and index == len(self.snapshots):
+                if error is not None:
+                    yield {"error": error}
+                return
+
+
+class SimulationService:
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self.jobs: Dict[str, SimulationJob] = dict()
+        self.lock = threading.Lock()
+
+    def warm_up(self):
+        # воркеры ProcessPoolExecutor создаются лениво - заставляем их подняться сразу
+        for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, params, seed=DEFAULT_SEED, replications=DEFAULT_REPLICATIONS):
+        # некорректная задача отклоняется до регистрации: иначе она повисла бы в self.jobs
+        # и все одинаковые запросы ждали бы ее вечно
+        validate_job(params, seed, replications)
+        key = job_key(params, seed, replications)
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None:
+                return job
+            job = SimulationJob(key, replications)
+            self.jobs[key] = job
+
+        chunks = [
+            (chunk_index, min(self.chunk_size, replications - start))
+            for chunk_index, start in enumerate(range(0, replications, self.chunk_size))
+        ]
+        job.pending_chunks = len(chunks)
+        for chunk_index, chunk_replications in chunks:
+            future = self.executor.submit(_run_chunk, params, seed, chunk_index, chunk_replications)
+            future.add_done_callback(lambda future, job=job: self._on_chunk_done(job, future))
+        return job
+
+    def _on_chunk_done(self, job: SimulationJob, future):
+        error = future.exception()
+        if error is None:
+            job.publish(future.result())
+        with job.condition:
+            job.pending_chunks -= 1
+            finished = job.pending_chunks == 0 or error is not None
+        if finished and not job.done:
+            with self.lock:
+                self.jobs.pop(job.key, None)
+            job.finish(None if error is None else repr(error))
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    service: SimulationService = None
+    protocol_version = "HTTP/1.1"
+    # текст ошибки без html-обертки - его показывает submit_job
+    error_content_type = "text/plain;charset=utf-8"
+    error_message_format = "%(message)s\n"
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            job = self.service.submit(
+                body.get("config", {}),
+                body.get("seed", DEFAULT_SEED),
+                body.get("replications", DEFAULT_REPLICATIONS))
+        except (ValueError, TypeError) as error:
+            self.send_error(400, str(error))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for snapshot in job.stream():
+            line = (json.dumps(snapshot) + "\n").encode()
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def address_string(self):
+        # у unix-сокета нет адреса клиента
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(service: SimulationService, host="127.0.0.1", port=DEFAULT_PORT, unix_socket=None):
+    handler = type("BoundSimulationRequestHandler", (SimulationRequestHandler,), {"service": service})
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# ============ #
+#    КЛИЕНТ    #
+# ============ #
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def submit_job(params, seed=DEFAULT_SEED, replications=DEFAULT_REPLICATIONS,
+               host="127.0.0.1", port=DEFAULT_PORT, unix_socket=None):
+    # генератор накопленных метрик по мере их готовности на сервисе
+    if unix_socket is not None:
+        connection = UnixHTTPConnection(unix_socket)
+    else:
+        connection = http.client.HTTPConnection(host, port)
+    body = json.dumps({"config": params, "seed": seed, "replications": replications})
+    connection.request("POST", "/jobs", body, {"Content-Type": "application/json"})
+    try:
+        response = connection.getresponse()
+        if response.status != 200:
+            # тело дочитываем, иначе сервис получит BrokenPipeError, дописывая ответ с ошибкой
+            detail = response.read().decode(errors="replace").strip()
+            raise RuntimeError(f"simulation service error {response.status}: {detail or response.reason}")
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный сервис прогонов CatHouseFactory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix-socket", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    service = SimulationService(args.workers, args.chunk_size)
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.unix_socket)
+    print(f"simulation service: {args.unix_socket or f'http://{args.host}:{args.port}'}, {service.workers} workers", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
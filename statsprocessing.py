@@ -21,4 +21,52 @@ def extract_business_metrics(stats):
         'houses_per_time': base_metrics['for_sale'] / base_metrics['total_time'],
         'house_success_rate': base_metrics['for_sale'] / base_metrics['planned_houses_num'],
         'cat_approval_rate': base_metrics['for_sale'] / (base_metrics['for_sale'] + base_metrics['for_utilization'])
-    }
\ No newline at end of file
+    }
+
+# Оценки по точным вероятностям (требуют CatFactoryConfig(ANALYTIC_TESTING=True))
+def extract_expected_houses_for_sale(stats):
+    return sum(sum(stat["house_sale_probabilities"]) for stat in stats) / len(stats)
+def extract_expected_houses_for_utilization(stats):
+    return sum(len(stat["house_sale_probabilities"]) - sum(stat["house_sale_probabilities"]) for stat in stats) / len(stats)
+def extract_avg_expected_test_time(stats):
+    return sum(sum(stat["house_expected_test_times"]) for stat in stats) / sum(len(stat["house_expected_test_times"]) for stat in stats)
+
+def extract_expected_base_metrics(stats):
+    return {
+        'total_time': extract_avg_total_time(stats),
+        'for_sale': extract_expected_houses_for_sale(stats),
+        'for_utilization': extract_expected_houses_for_utilization(stats),
+        'planned_houses_num': extract_avg_planned_houses(stats),
+        'test_time': extract_avg_expected_test_time(stats)
+    }
+
+def extract_expected_business_metrics(stats):
+    base_metrics = extract_expected_base_metrics(stats)
+    return {
+        'houses_per_time': base_metrics['for_sale'] / base_metrics['total_time'],
+        'house_success_rate': base_metrics['for_sale'] / base_metrics['planned_houses_num'],
+        'cat_approval_rate': base_metrics['for_sale'] / (base_metrics['for_sale'] + base_metrics['for_utilization'])
+    }
+
+
+# Средние по тестам одного прогона (как average_metas в simulation.ipynb),
+# работают и со списком словарей, и с компактными представлениями из compactstats
+def extract_house_testing_averages(step_metas, max_test_time=None):
+    # max_test_time (config.MAX_TEST_TIME) обязателен для full/compact, в summary берется из длины гистограммы
+    if hasattr(step_metas, "entry_timing_histogram"):
+        max_test_time = len(step_metas.entry_timing_histogram) - 1
+        entry_sum = step_metas.entry_timing_sum()
+        inside_sum = step_metas.time_inside_sum()
+        no_entry = step_metas.no_entry_count
+    else:
+        if max_test_time is None:
+            raise ValueError("max_test_time is required for full and compact house_testing_metas")
+        entered = [meta for meta in step_metas if meta['entry_timing'] is not None]
+        entry_sum = sum(meta['entry_timing'] for meta in entered)
+        inside_sum = sum(meta['time_inside'] for meta in entered)
+        no_entry = len(step_metas) - len(entered)
+    return {
+        'avg_step_entry_timing': (entry_sum + no_entry * max_test_time) / len(step_metas),
+        'avg_step_time_inside': inside_sum / len(step_metas),
+        'avg_step_test_time': (entry_sum + inside_sum + no_entry * max_test_time) / len(step_metas)
+    }
@@ -0,0 +1,213 @@
+import inspect
+from abc import ABC, abstractmethod
+import itertools
+import math
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from scipy.linalg import cho_solve, solve_triangular
+
+from cathousefactory import CatFactoryConfig
+from runner import DEFAULT_SEED, chunk_seed, simulate_business_metrics
+
+# ======================== #
+#   СУРРОГАТНАЯ МЕТАМОДЕЛЬ #
+# ======================== #
+# Обучается на уже посчитанных прогонах вида (параметры CatFactoryConfig, метрики
+# extract_business_metrics) - ровно то, что копится в results в lab3/lab4 - и
+# отвечает на вопросы "что если" без новых симуляций, вместе с оценкой неуверенности.
+
+FEATURE_DEFAULTS = {
+    name: param.default
+    for name, param in inspect.signature(CatFactoryConfig.__init__).parameters.items()
+    if isinstance(param.default, (int, float)) and not isinstance(param.default, bool)
+}
+# без переопределения деревянные детали обрабатываются в среднем за 1
+FEATURE_DEFAULTS["DETAIL_PROCESSING_TIME_OVERRIDE"] = 1.0
+
+
+class SurrogateModel(ABC):
+    def __init__(self, feature_names: List[str] = None, seed=DEFAULT_SEED):
+        self.feature_names = feature_names
+        # из seed выводятся сиды досчитываемых симуляций, у каждой своя
+        self.seed = seed
+        self.metric_names = None
+        self.results = []
+
+    # ---- обучение ----
+
+    def fit(self, results: List[Tuple[Dict, Dict]]):
+        self.results = list(results)
+        if self.feature_names is None:
+            self.feature_names = sorted({name for params, _ in self.results for name in params})
+        if self.metric_names is None:
+            self.metric_names = sorted({name for _, metrics in self.results for name in metrics})
+
+        X = np.array([self.encode(params) for params, _ in self.results], dtype=float)
+        Y = np.array([[metrics[m] for m in self.metric_names] for _, metrics in self.results], dtype=float)
+
+        self.x_mean = X.mean(axis=0)
+        self.x_scale = X.std(axis=0)
+        self.x_scale[self.x_scale == 0] = 1.0
+        self.y_mean = Y.mean(axis=0)
+        self.y_scale = Y.std(axis=0)
+        self.y_scale[self.y_scale == 0] = 1.0
+
+        self._fit_arrays((X - self.x_mean) / self.x_scale, (Y - self.y_mean) / self.y_scale)
+        return self
+
+    def add(self, params: Dict, metrics: Dict):
+        return self.fit(self.results + [(params, metrics)])
+
+    def encode(self, params: Dict):
+        features = []
+        for name in self.feature_names:
+            value = params.get(name)
+            if value is None:
+                value = FEATURE_DEFAULTS.get(name)
+            if value is None:
+                raise ValueError(f"no value for feature {name}")
+            features.append(float(value))
+        return features
+
+    # ---- предсказание ----
+
+    def predict(self, params: Dict) -> Dict[str, Tuple[float, float]]:
+        means, stds = self.predict_many([params])
+        return {m: (float(means[0, i]), float(stds[0, i])) for i, m in enumerate(self.metric_names)}
+
+    def predict_many(self, params_list: List[Dict]):
+        X = (np.array([self.encode(params) for params in params_list], dtype=float) - self.x_mean) / self.x_scale
+        means, stds = self._predict_arrays(X)
+        return means * self.y_scale + self.y_mean, stds * self.y_scale
+
+    def max_relative_std(self, params: Dict):
+        return max(std / max(abs(mean), 1e-12) for mean, std in self.predict(params).values())
+
+    # ---- дозапуск симуляций ----
+
+    def ask(
+            self,
+            params: Dict,
+            max_relative_std=0.05,
+            simulate: Callable[[Dict, int], Dict] = simulate_business_metrics,
+            candidates: List[Dict] = None,
+            budget=5,
+        ):
+        # если ответ слишком неуверенный - досчитываем симуляции в самых
+        # информативных точках (по умолчанию - в самой точке запроса)
+        candidates = [params] if candidates is None else candidates
+        for _ in range(budget):
+            if self.max_relative_std(params) <= max_relative_std:
+                break
+            self.simulate_and_add(self.most_informative(candidates), simulate)
+        return self.predict(params)
+
+    def refine(
+            self,
+            candidates: List[Dict],
+            max_relative_std=0.05,
+            simulate: Callable[[Dict, int], Dict] = simulate_business_metrics,
+            budget=10,
+        ):
+        # активное обучение по сетке кандидатов: досчитываем, пока вся сетка не станет достаточно уверенной
+        for _ in range(budget):
+            if max(self.max_relative_std(params) for params in candidates) <= max_relative_std:
+                break
+            self.simulate_and_add(self.most_informative(candidates), simulate)
+        return self
+
+    def simulate_and_add(self, point: Dict, simulate: Callable[[Dict, int], Dict] = simulate_business_metrics):
+        # повторная симуляция той же точки с тем же сидом не дает новой информации,
+        # поэтому каждый досчитанный образец получает свой сид
+        seed = chunk_seed(self.seed, len(self.results))
+        return self.add(point, simulate(point, seed))
+
+    def most_informative(self, candidates: List[Dict]):
+        # точка с наибольшей суммарной (нормированной) дисперсией предсказания
+        _, stds = self.predict_many(candidates)
+        scores = ((stds / self.y_scale) ** 2).sum(axis=1)
+        return candidates[int(np.argmax(scores))]
+
+    @abstractmethod
+    def _fit_arrays(self, X, Y):
+        ...
+
+    @abstractmethod
+    def _predict_arrays(self, X):
+        ...
+
+
+class PolynomialSurrogate(SurrogateModel):
+    # полиномиальная (гребневая) регрессия, неуверенность - ст. отклонение оценки среднего
+    def __init__(self, feature_names: List[str] = None, degree=2, ridge=1e-6, seed=DEFAULT_SEED):
+        super().__init__(feature_names, seed)
+        self.degree = degree
+        self.ridge = ridge
+
+    def _design(self, X):
+        columns = [np.ones(len(X))]
+        for d in range(1, self.degree + 1):
+            for idx in itertools.combinations_with_replacement(range(X.shape[1]), d):
+                columns.append(np.prod(X[:, idx], axis=1))
+        return np.column_stack(columns)
+
+    def _fit_arrays(self, X, Y):
+        Phi = self._design(X)
+        n, p = Phi.shape
+        self.a_inv = np.linalg.inv(Phi.T @ Phi + self.ridge * np.eye(p))
+        self.coef = self.a_inv @ Phi.T @ Y
+        residuals = Y - Phi @ self.coef
+        dof = max(n - p, 1)
+        self.noise_var = (residuals ** 2).sum(axis=0) / dof
+
+    def _predict_arrays(self, X):
+        Phi = self._design(X)
+        leverage = np.einsum("ij,jk,ik->i", Phi, self.a_inv, Phi)
+        return Phi @ self.coef, np.sqrt(np.outer(leverage, self.noise_var))
+
+
+class GaussianProcessSurrogate(SurrogateModel):
+    # GP-регрессия с RBF ядром, гиперпараметры подбираются по сетке максимизацией правдоподобия
+    LENGTH_SCALES = (0.25, 0.5, 1.0, 2.0, 4.0)
+    NOISES = (1e-4, 1e-3, 1e-2, 1e-1)
+
+    def __init__(self, feature_names: List[str] = None, length_scales=LENGTH_SCALES, noises=NOISES, seed=DEFAULT_SEED):
+        super().__init__(feature_names, seed)
+        self.length_scales = length_scales
+        self.noises = noises
+
+    @staticmethod
+    def _sq_dists(A, B):
+        return ((A[:, None, :] - B[None, :, :]) ** 2).sum(axis=2)
+
+    def _fit_arrays(self, X, Y):
+        self.X = X
+        sq_dists = self._sq_dists(X, X)
+        n = len(X)
+        # отдельные гиперпараметры для каждой метрики
+        self.fits = []
+        for j in range(Y.shape[1]):
+            y = Y[:, j]
+            best = None
+            for length_scale, noise in itertools.product(self.length_scales, self.noises):
+                K = np.exp(-0.5 * sq_dists / length_scale ** 2) + noise * np.eye(n)
+                try:
+                    L = np.linalg.cholesky(K)
+                except np.linalg.LinAlgError:
+                    continue
+                alpha = cho_solve((L, True), y)
+                log_likelihood = -0.5 * y @ alpha - np.log(np.diag(L)).sum() - 0.5 * n * math.log(2 * math.pi)
+                if best is None or log_likelihood > best[0]:
+                    best = (log_likelihood, length_scale, noise, L, alpha)
+            self.fits.append(best[1:])
+
+    def _predict_arrays(self, X):
+        sq_dists = self._sq_dists(X, self.X)
+        means, stds = [], []
+        for length_scale, noise, L, alpha in self.fits:
+            K_star = np.exp(-0.5 * sq_dists / length_scale ** 2)
+            v = solve_triangular(L, K_star.T, lower=True)
+            means.append(K_star @ alpha)
+            stds.append(np.sqrt(np.maximum(1.0 - (v ** 2).sum(axis=0), 0.0)))
+        return np.column_stack(means), np.column_stack(stds)